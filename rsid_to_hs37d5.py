@@ -4,133 +4,500 @@ Convert rsIDs to hs37d5 genomic coordinates
 hs37d5 is the 1000 Genomes Project reference (GRCh37 + decoy sequences)
 """
 
-import requests
+import urllib3
+import functools
 import json
+import os
+import sqlite3
+import threading
 import time
 import sys
+from concurrent.futures import ThreadPoolExecutor
+from urllib3.util.retry import Retry
+
+try:
+    # orjson decodes large batch responses much faster than the stdlib
+    from orjson import loads as _json_loads
+except ImportError:
+    _json_loads = json.loads
+
+try:
+    # ijson parses batch responses as they arrive instead of buffering them
+    import ijson
+except ImportError:
+    ijson = None
+
+# Errors raised while sending a request or reading and decoding its body
+_REQUEST_ERRORS = (urllib3.exceptions.HTTPError, ValueError) + (
+    (ijson.JSONError,) if ijson else ())
+
+
+class TokenBucket:
+    """
+    Thread-safe token-bucket rate limiter.
+    
+    Allows bursts of up to `burst` requests, then `rate_per_sec` requests
+    per second on average, however many threads share it.
+    """
+    
+    def __init__(self, rate_per_sec, burst):
+        self.rate = rate_per_sec
+        self.burst = burst
+        self.tokens = burst
+        self.ts = time.monotonic()
+        self.lock = threading.Lock()
+    
+    def acquire(self):
+        """Block until a request may be sent."""
+        with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.ts) * self.rate)
+                self.ts = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                time.sleep((1 - self.tokens) / self.rate)
+
+
+# Default headers for every request; headers passed per request replace them.
+# Advertises gzip and deflate, plus br (and zstd) when a decoder for them is
+# installed, so urllib3 can always decompress what the server sends back.
+_HEADERS = urllib3.util.make_headers(accept_encoding=True)
+
+# One connection pool per API host so repeated lookups reuse open TLS
+# connections. Blocking on a full pool makes extra threads wait for a
+# kept-alive connection instead of opening (and then discarding) new ones.
+_POOL = urllib3.PoolManager(
+    num_pools=4, maxsize=32, block=True, headers=_HEADERS,
+    # The batch endpoints are read-only lookups sent as POST, so retry those too
+    retries=Retry(total=3, backoff_factor=0.3,
+                  status_forcelist=[429, 500, 502, 503, 504],
+                  allowed_methods=Retry.DEFAULT_ALLOWED_METHODS | {'POST'})
+)
+
+# Shared request rate limits for each API
+_BUCKET_MV = TokenBucket(rate_per_sec=5, burst=5)
+_BUCKET_ENS = TokenBucket(rate_per_sec=15, burst=15)
+
+# API endpoints; single-ID lookups append the rsID to the URL
+_MV_URL = "https://myvariant.info/v1/variant/"
+_MV_BATCH_URL = "https://myvariant.info/v1/variant"
+_ENS_URL = "https://grch37.rest.ensembl.org/variation/human/"
+_ENS_BATCH_URL = "https://grch37.rest.ensembl.org/variation/human"
+
+# Request parameters are the same for every lookup
+_MV_PARAMS = {
+    'assembly': 'hg19',  # hg19 and GRCh37 have same coordinates as hs37d5 main chromosomes
+    # Only the fields the parsers read, to keep batch responses small
+    'fields': 'dbsnp.hg19.chr,dbsnp.hg19.start,dbsnp.ref,dbsnp.alt'
+}
+_ENS_HEADERS = {**_HEADERS, "Content-Type": "application/json"}
+_ENS_BATCH_HEADERS = {**_ENS_HEADERS, "Accept": "application/json"}
+
+# Most IDs each batch endpoint accepts per request
+_MV_BATCH_SIZE = 1000
+_ENS_BATCH_SIZE = 200
+
+# Entries kept in the in-memory memo of single-rsID lookups; see set_cache_size
+_MEMO_SIZE = 100_000
+
+# Locus display templates used by format_loci
+_FMT_HS37D5 = "%s:%s (%s/%s)"
+_FMT_STD = "chr%s:%s (%s/%s)"
+
+
+def _canon(rsid):
+    """Return `rsid` with its 'rs' prefix."""
+    return rsid if rsid[:2] == 'rs' else 'rs' + rsid
+
+
+# Lookups, including rsIDs that were not found, persist between runs in a
+# small SQLite store and are refetched once they are older than the TTL
+_CACHE_PATH = os.path.expanduser('~/.cache/rsid_hs37d5.sqlite')
+_CACHE_TTL = 30 * 86400
+_cache_conn = None
+_cache_lock = threading.Lock()
+
+
+def _get_cache():
+    """
+    Open the on-disk loci cache, creating it on first use.
+    Returns None if the cache file cannot be opened.
+    """
+    global _cache_conn
+    with _cache_lock:
+        if _cache_conn is None:
+            try:
+                os.makedirs(os.path.dirname(_CACHE_PATH), exist_ok=True)
+                conn = sqlite3.connect(_CACHE_PATH, check_same_thread=False)
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS loci("
+                    "rsid TEXT, method TEXT, json TEXT, "
+                    "fetched_at INTEGER NOT NULL DEFAULT 0, PRIMARY KEY (rsid, method))"
+                )
+                try:
+                    # Caches written before fetched_at existed; their rows count as stale
+                    conn.execute(
+                        "ALTER TABLE loci ADD COLUMN fetched_at INTEGER NOT NULL DEFAULT 0")
+                except sqlite3.OperationalError:
+                    pass
+                conn.execute("DELETE FROM loci WHERE fetched_at < ?",
+                             (int(time.time()) - _CACHE_TTL,))
+                conn.commit()
+                _cache_conn = conn
+            except (OSError, sqlite3.Error) as e:
+                print(f"Loci cache unavailable: {e}")
+                _cache_conn = False
+    return _cache_conn or None
+
+
+def _cache_get_many(rsids, method):
+    """
+    Look up cached loci for `rsids` resolved with `method`.
+    
+    Returns:
+        dict mapping the cached rsIDs to their loci information, or to
+        None for rsIDs that were looked up and not found
+    """
+    conn = _get_cache()
+    if conn is None:
+        return {}
+    
+    cached = {}
+    cutoff = int(time.time()) - _CACHE_TTL
+    with _cache_lock:
+        # Stay under SQLite's limit on bound parameters per statement
+        for i in range(0, len(rsids), 900):
+            chunk = rsids[i:i + 900]
+            placeholders = ','.join('?' * len(chunk))
+            rows = conn.execute(
+                f"SELECT rsid, json FROM loci WHERE rsid IN ({placeholders}) "
+                "AND method=? AND fetched_at >= ?",
+                chunk + [method, cutoff]
+            )
+            for rsid, payload in rows:
+                cached[rsid] = json.loads(payload)
+    return cached
+
+
+def _cache_put_many(loci, method):
+    """
+    Store lookups (a dict mapping rsIDs to loci information, or to None
+    for rsIDs that were not found) under `method`.
+    """
+    conn = _get_cache()
+    if conn is None or not loci:
+        return
+    
+    now = int(time.time())
+    with _cache_lock:
+        conn.executemany(
+            "INSERT OR REPLACE INTO loci(rsid, method, json, fetched_at) VALUES (?, ?, ?, ?)",
+            [(rsid, method, json.dumps(result), now) for rsid, result in loci.items()]
+        )
+        conn.commit()
+
+
+def _copy_loci(loci):
+    """
+    Return a copy of a memoized loci record (or None), so callers can
+    modify their result without changing what later lookups get.
+    """
+    if loci is None:
+        return None
+    return dict(loci, alt_alleles=list(loci['alt_alleles']))
+
+
+def _strip_chr(chrom):
+    """Drop a leading 'chr' from a chromosome name."""
+    return chrom[3:] if chrom.startswith('chr') else chrom
+
+
+def _extract_hg19(hg19_data):
+    """
+    Return (chromosome, position) from a MyVariant.info dbsnp.hg19 entry,
+    which is either a dict or a list of dicts (first one wins).
+    """
+    if isinstance(hg19_data, list):
+        if not hg19_data:
+            return None, None
+        hg19_data = hg19_data[0]
+    elif not isinstance(hg19_data, dict):
+        return None, None
+    return _strip_chr(str(hg19_data.get('chr', ''))), hg19_data.get('start')
+
+
+def _parse_myvariant(rsid, data):
+    """
+    Extract hs37d5 loci from a MyVariant.info variant document.
+    
+    Returns:
+        dict with chromosome, position, and other info, or None if the
+        document has no usable hg19 coordinates
+    """
+    dbsnp = data.get('dbsnp') if isinstance(data, dict) else None
+    if not isinstance(dbsnp, dict) or 'hg19' not in dbsnp:
+        return None
+    
+    # Extract coordinates; bail out before building the record if there are none
+    chrom, pos = _extract_hg19(dbsnp['hg19'])
+    if not (chrom and pos):
+        return None
+    
+    alt = dbsnp.get('alt', [])
+    return {
+        'rsid': rsid,
+        'chromosome': chrom,
+        'position': pos,
+        'ref_allele': dbsnp.get('ref'),
+        'alt_alleles': [alt] if isinstance(alt, str) else alt,
+        'build': 'hs37d5'
+    }
+
+
+@functools.lru_cache(maxsize=_MEMO_SIZE)
+def _fetch_myvariant(rsid):
+    """
+    Look up `rsid` on MyVariant.info, raising on request errors so that
+    failures are neither memoized nor mistaken for unknown rsIDs.
+    """
+    url = _MV_URL + rsid
+    _BUCKET_MV.acquire()
+    response = _POOL.request('GET', url, fields=_MV_PARAMS, timeout=10)
+    
+    # MyVariant.info answers unknown rsIDs with 404; any other error status
+    # is a failed request, not an answer
+    if response.status == 404:
+        return None
+    _raise_for_status(response, url)
+    
+    data = _json_loads(response.data)
+    
+    # An rsID that maps to several variants comes back as a list of documents;
+    # keep the first one with coordinates, as the batch path does
+    if isinstance(data, list):
+        for hit in data:
+            result = _parse_myvariant(rsid, hit)
+            if result:
+                return result
+        return None
+    
+    return _parse_myvariant(rsid, data)
 
 
 def get_hs37d5_loci_myvariant(rsid):
     """
     Get hs37d5 coordinates using MyVariant.info API.
     hs37d5 uses the same coordinates as GRCh37/hg19 for chromosomes 1-22, X, Y, MT.
+    `rsid` must include the 'rs' prefix.
     """
-    if not rsid.startswith('rs'):
-        rsid = f"rs{rsid}"
+    try:
+        return _copy_loci(_fetch_myvariant(rsid))
+    except _REQUEST_ERRORS as e:
+        print(f"Error with MyVariant.info API: {e}")
+        return None
+
+
+def _raise_for_status(response, url):
+    """Raise an HTTPError if `response` (a request to `url`) has a 4xx or 5xx status."""
+    if response.status >= 400:
+        raise urllib3.exceptions.HTTPError(f"{response.status} error for url: {url}")
+
+
+def _iter_json_array(response):
+    """
+    Yield the items of a JSON array response body.
+    Streams them with ijson if available, otherwise decodes the whole body.
+    """
+    if ijson is None:
+        yield from _json_loads(response.data)
+    else:
+        # urllib3 undoes gzip as ijson reads from the response
+        yield from ijson.items(response, 'item', use_float=True)
+
+
+def get_hs37d5_loci_myvariant_batch(rsids, chunk=_MV_BATCH_SIZE):
+    """
+    Get hs37d5 coordinates for many rsIDs using MyVariant.info's batch endpoint.
     
-    url = f"https://myvariant.info/v1/variant/{rsid}"
-    params = {
-        'assembly': 'hg19',  # hg19 and GRCh37 have same coordinates as hs37d5 main chromosomes
-        'fields': 'dbsnp.rsid,dbsnp.chrom,dbsnp.hg19,dbsnp.ref,dbsnp.alt'
-    }
+    Up to `chunk` IDs are sent per POST request, so a long list costs a
+    handful of round-trips instead of one per rsID. When ijson is
+    installed the response array is parsed as it streams in, so memory
+    use does not grow with the size of the batch.
     
-    try:
-        response = requests.get(url, params=params, timeout=10)
-        
-        if response.status_code == 404:
-            return None
-        
-        response.raise_for_status()
-        data = response.json()
-        
-        result = {
-            'rsid': rsid,
-            'chromosome': None,
-            'position': None,
-            'ref_allele': None,
-            'alt_alleles': [],
-            'build': 'hs37d5'
-        }
-        
-        # Extract coordinates
-        if 'dbsnp' in data and 'hg19' in data['dbsnp']:
-            hg19_data = data['dbsnp']['hg19']
-            
-            # Handle both dict and list formats
-            if isinstance(hg19_data, dict):
-                chrom = str(hg19_data.get('chr', '')).replace('chr', '')
-                result['chromosome'] = chrom
-                result['position'] = hg19_data.get('start')
-            elif isinstance(hg19_data, list) and len(hg19_data) > 0:
-                chrom = str(hg19_data[0].get('chr', '')).replace('chr', '')
-                result['chromosome'] = chrom
-                result['position'] = hg19_data[0].get('start')
-            
-            # Get alleles
-            if 'ref' in data['dbsnp']:
-                result['ref_allele'] = data['dbsnp']['ref']
-            if 'alt' in data['dbsnp']:
-                alt = data['dbsnp']['alt']
-                result['alt_alleles'] = [alt] if isinstance(alt, str) else alt
+    Args:
+        rsids: List of rsIDs (with 'rs' prefix)
+        chunk: Number of IDs per request (MyVariant.info accepts up to 1000)
+    
+    Returns:
+        dict mapping rsIDs to their loci information, or to None for IDs
+        MyVariant.info does not know; IDs from failed requests are omitted
+    """
+    results = {}
+    
+    for i in range(0, len(rsids), chunk):
+        data = dict(_MV_PARAMS, ids=','.join(rsids[i:i + chunk]))
         
-        if result['chromosome'] and result['position']:
-            return result
+        try:
+            _BUCKET_MV.acquire()
+            response = _POOL.request('POST', _MV_BATCH_URL, fields=data,
+                                     encode_multipart=False, timeout=30,
+                                     preload_content=ijson is None)
+            try:
+                _raise_for_status(response, _MV_BATCH_URL)
+                
+                # One document per hit; an rsID can map to several variants, keep the
+                # first one with coordinates
+                for hit in _iter_json_array(response):
+                    rsid = hit.get('query')
+                    if results.get(rsid):
+                        continue
+                    results[rsid] = None if hit.get('notfound') else _parse_myvariant(rsid, hit)
+            finally:
+                # Return a streamed connection to the pool once its body is consumed
+                response.drain_conn()
+                response.release_conn()
+        except _REQUEST_ERRORS as e:
+            print(f"Error with MyVariant.info API: {e}")
+    
+    return results
+
+
+def _parse_ensembl(rsid, data):
+    """
+    Extract hs37d5 loci from an Ensembl variation object.
+    
+    Returns:
+        dict with chromosome, position, and other info, or None if the
+        object has no mappings
+    """
+    mappings = data.get('mappings')
+    if not mappings:
         return None
-            
-    except requests.exceptions.RequestException as e:
-        print(f"Error with MyVariant.info API: {e}")
+    
+    mapping = mappings[0]
+    chrom = _strip_chr(mapping.get('seq_region_name', ''))
+    pos = mapping.get('start')
+    if not (chrom and pos):
         return None
+    
+    alleles = mapping['allele_string'].split('/') if 'allele_string' in mapping else []
+    return {
+        'rsid': rsid,
+        'chromosome': chrom,
+        'position': pos,
+        'ref_allele': alleles[0] if alleles else None,
+        'alt_alleles': alleles[1:],
+        'build': 'hs37d5'
+    }
+
+
+@functools.lru_cache(maxsize=_MEMO_SIZE)
+def _fetch_ensembl(rsid):
+    """
+    Look up `rsid` on Ensembl, raising on request errors so that
+    failures are neither memoized nor mistaken for unknown rsIDs.
+    """
+    url = _ENS_URL + rsid
+    _BUCKET_ENS.acquire()
+    response = _POOL.request('GET', url, headers=_ENS_HEADERS, timeout=10)
+    
+    # Ensembl answers unknown rsIDs with 400; any other error status
+    # is a failed request, not an answer
+    if response.status == 400:
+        return None
+    _raise_for_status(response, url)
+    
+    return _parse_ensembl(rsid, _json_loads(response.data))
 
 
 def get_hs37d5_loci_ensembl(rsid):
     """
     Get hs37d5 coordinates using Ensembl REST API (GRCh37 archive).
     hs37d5 main chromosomes match GRCh37 coordinates.
+    `rsid` must include the 'rs' prefix.
     """
-    if not rsid.startswith('rs'):
-        rsid = f"rs{rsid}"
-    
-    url = f"https://grch37.rest.ensembl.org/variation/human/{rsid}"
-    headers = {"Content-Type": "application/json"}
-    
     try:
-        response = requests.get(url, headers=headers, timeout=10)
-        
-        if response.status_code == 404:
-            return None
-        
-        response.raise_for_status()
-        data = response.json()
-        
-        result = {
-            'rsid': rsid,
-            'chromosome': None,
-            'position': None,
-            'ref_allele': None,
-            'alt_alleles': [],
-            'build': 'hs37d5'
-        }
-        
-        if 'mappings' in data and len(data['mappings']) > 0:
-            mapping = data['mappings'][0]
-            
-            chrom = mapping.get('seq_region_name', '').replace('chr', '')
-            result['chromosome'] = chrom
-            result['position'] = mapping.get('start')
-            
-            if 'allele_string' in mapping:
-                alleles = mapping['allele_string'].split('/')
-                if len(alleles) > 0:
-                    result['ref_allele'] = alleles[0]
-                if len(alleles) > 1:
-                    result['alt_alleles'] = alleles[1:]
-        
-        if result['chromosome'] and result['position']:
-            return result
-        return None
-            
-    except requests.exceptions.RequestException as e:
+        return _copy_loci(_fetch_ensembl(rsid))
+    except _REQUEST_ERRORS as e:
         print(f"Error with Ensembl API: {e}")
         return None
 
 
-def get_hs37d5_loci(rsid, method='myvariant'):
+def get_hs37d5_loci_ensembl_batch(rsids, chunk=_ENS_BATCH_SIZE):
+    """
+    Get hs37d5 coordinates for many rsIDs using Ensembl's POST variation endpoint.
+    
+    Args:
+        rsids: List of rsIDs (with 'rs' prefix)
+        chunk: Number of IDs per request (Ensembl accepts up to 200)
+    
+    Returns:
+        dict mapping rsIDs to their loci information, or to None for IDs
+        Ensembl does not know; IDs from failed requests are omitted
+    """
+    results = {}
+    
+    for i in range(0, len(rsids), chunk):
+        ids = rsids[i:i + chunk]
+        try:
+            _BUCKET_ENS.acquire()
+            response = _POOL.request('POST', _ENS_BATCH_URL,
+                                     body=json.dumps({'ids': ids}),
+                                     headers=_ENS_BATCH_HEADERS, timeout=30)
+            _raise_for_status(response, _ENS_BATCH_URL)
+            variations = _json_loads(response.data)
+        except _REQUEST_ERRORS as e:
+            print(f"Error with Ensembl API: {e}")
+            continue
+        
+        # Unknown IDs are simply absent from the response
+        results.update(dict.fromkeys(ids))
+        for rsid, variation in variations.items():
+            results[rsid] = _parse_ensembl(rsid, variation)
+    
+    return results
+
+
+def _sources():
+    """Map each lookup method to the (fetcher, API name) pairs it tries."""
+    return {
+        'myvariant': [(_fetch_myvariant, 'MyVariant.info')],
+        'ensembl': [(_fetch_ensembl, 'Ensembl')],
+        'auto': [(_fetch_myvariant, 'MyVariant.info'), (_fetch_ensembl, 'Ensembl')],
+    }
+
+
+_SOURCES = _sources()
+
+
+def set_cache_size(cache_size):
+    """
+    Resize the in-memory memo of single-rsID lookups, clearing it.
+    
+    Args:
+        cache_size (int or None): Most lookups to memoize, or None to
+            disable the memo. The on-disk cache is unaffected.
+    """
+    global _fetch_myvariant, _fetch_ensembl
+    fetchers = [getattr(f, '__wrapped__', f)
+                for f in (_fetch_myvariant, _fetch_ensembl)]
+    if cache_size is not None:
+        fetchers = [functools.lru_cache(maxsize=cache_size)(f) for f in fetchers]
+    _fetch_myvariant, _fetch_ensembl = fetchers
+    _SOURCES.update(_sources())
+
+
+def get_hs37d5_loci(rsid, method='myvariant', use_cache=True):
     """
     Get hs37d5 genomic coordinates for a given rsID.
     
     Args:
         rsid: SNP rsID (with or without 'rs' prefix)
         method: 'myvariant', 'ensembl', or 'auto' for fallback
+        use_cache: Check and update the on-disk loci cache and the
+                   in-memory memo of earlier lookups (sized by set_cache_size)
     
     Returns:
         dict with chromosome, position, and other info, or None if not found
@@ -143,50 +510,120 @@ def get_hs37d5_loci(rsid, method='myvariant'):
         
         For standard chromosomes, coordinates match GRCh37/hg19 exactly.
     """
-    if not rsid.startswith('rs'):
-        rsid = f"rs{rsid}"
-    
-    if method == 'myvariant':
-        return get_hs37d5_loci_myvariant(rsid)
-    elif method == 'ensembl':
-        return get_hs37d5_loci_ensembl(rsid)
-    elif method == 'auto':
-        # Try MyVariant first, fall back to Ensembl
-        result = get_hs37d5_loci_myvariant(rsid)
-        if result is None:
-            result = get_hs37d5_loci_ensembl(rsid)
-        return result
-    else:
+    if method not in _SOURCES:
         raise ValueError(f"Unknown method: {method}")
+    
+    rsid = _canon(rsid)
+    
+    if use_cache:
+        cached = _cache_get_many([rsid], method)
+        if rsid in cached:
+            return cached[rsid]
+    
+    # 'auto' tries MyVariant first and falls back to Ensembl
+    result = None
+    answered = True
+    for fetch, api in _SOURCES[method]:
+        try:
+            # Bypassing the cache skips the lru_cache memo on the fetcher too
+            if not use_cache:
+                fetch = getattr(fetch, '__wrapped__', fetch)
+            result = fetch(rsid)
+        except _REQUEST_ERRORS as e:
+            print(f"Error with {api} API: {e}")
+            answered = False
+            continue
+        if result:
+            break
+    
+    # A miss is only cached once every API consulted has answered for it
+    if use_cache and (result or answered):
+        _cache_put_many({rsid: result}, method)
+    return _copy_loci(result)
 
 
-def batch_get_loci(rsid_list, delay=0.2, method='myvariant'):
+def batch_get_loci(rsid_list, delay=None, method='myvariant', concurrency=10,
+                   use_cache=True, *, rate=None):
     """
     Get hs37d5 coordinates for multiple rsIDs.
     
+    Both APIs are queried through their batch endpoints, and up to
+    `concurrency` batch requests are kept in flight at once on a thread
+    pool. In 'auto' mode only the IDs MyVariant.info could not resolve
+    are sent to Ensembl.
+    
     Args:
         rsid_list: List of rsIDs
-        delay: Delay between requests in seconds
+        delay: Minimum seconds between batch requests; kept for older
+               callers and equivalent to rate=1/delay (ignored if <= 0)
         method: API method to use
+        concurrency: Maximum number of simultaneous batch requests
+                     (1 sends them one after another)
+        use_cache: Serve previously looked-up rsIDs (found or not) from the
+                   on-disk loci cache and store new lookups
+        rate: Maximum batch requests per second for this call (ignored if
+              <= 0); by default only the shared per-API limits apply
+              (MyVariant.info 5/s, Ensembl 15/s)
     
     Returns:
         dict mapping rsIDs to their loci information
     """
-    results = {}
+    if method not in _SOURCES:
+        raise ValueError(f"Unknown method: {method}")
     
-    for i, rsid in enumerate(rsid_list):
-        if not rsid.startswith('rs'):
-            rsid = f"rs{rsid}"
-            
-        result = get_hs37d5_loci(rsid, method=method)
-        if result:
-            results[rsid] = result
-        else:
-            print(f"Could not find coordinates for {rsid}")
+    rsids = [_canon(rsid) for rsid in rsid_list]
+    
+    # Only rsIDs missing from the cache go to the network
+    cached = _cache_get_many(rsids, method) if use_cache else {}
+    misses = [rsid for rsid in dict.fromkeys(rsids) if rsid not in cached]
+    
+    # Like the old delay, non-positive values add no limit
+    if rate is None and delay is not None and delay > 0:
+        rate = 1 / delay
+    bucket = TokenBucket(rate, burst=1) if rate is not None and rate > 0 else None
+    
+    def fetch_all(fetch_batch, ids, size):
+        chunks = [ids[i:i + size] for i in range(0, len(ids), size)]
+        
+        def fetch_chunk(chunk):
+            if bucket:
+                bucket.acquire()
+            return fetch_batch(chunk)
+        
+        found = {}
+        with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+            for chunk_found in executor.map(fetch_chunk, chunks):
+                found.update(chunk_found)
+        return found
+    
+    # Lookups map to None for rsIDs an API answered as unknown
+    loci = {}
+    if method in ('myvariant', 'auto'):
+        loci = fetch_all(get_hs37d5_loci_myvariant_batch, misses, _MV_BATCH_SIZE)
+    
+    # Ensembl has the final say on everything MyVariant.info did not resolve
+    if method in ('ensembl', 'auto'):
+        pending = [rsid for rsid in misses if not loci.get(rsid)]
+        # IDs whose MyVariant.info request failed were never answered by it
+        unanswered = set()
+        if method == 'auto':
+            unanswered = {rsid for rsid in pending if rsid not in loci}
+        loci = {rsid: result for rsid, result in loci.items() if result}
+        loci.update(fetch_all(get_hs37d5_loci_ensembl_batch, pending, _ENS_BATCH_SIZE))
         
-        # Rate limiting
-        if delay > 0 and i < len(rsid_list) - 1:
-            time.sleep(delay)
+        # A miss is only definitive once every API consulted has answered for it
+        for rsid in unanswered:
+            if rsid in loci and not loci[rsid]:
+                del loci[rsid]
+    
+    if use_cache:
+        _cache_put_many(loci, method)
+    loci.update(cached)
+    
+    results = {rsid: loci[rsid] for rsid in rsids if loci.get(rsid)}
+    for rsid in dict.fromkeys(rsids):
+        if rsid not in results:
+            print(f"Could not find coordinates for {rsid}")
     
     return results
 
@@ -202,27 +639,27 @@ def format_loci(loci, style='standard'):
     if not loci:
         return "Not found"
     
-    chrom = loci['chromosome']
-    pos = loci['position']
-    ref = loci.get('ref_allele', 'N/A')
-    alt = ','.join(loci.get('alt_alleles', [])) or 'N/A'
+    alt_alleles = loci.get('alt_alleles')
+    alt = ','.join(alt_alleles) if alt_alleles else 'N/A'
     
-    if style == 'hs37d5':
-        # hs37d5 typically uses no 'chr' prefix
-        return f"{chrom}:{pos} ({ref}/{alt})"
-    else:
-        # Standard format with 'chr' prefix
-        return f"chr{chrom}:{pos} ({ref}/{alt})"
+    # hs37d5 typically uses no 'chr' prefix; standard format adds it
+    template = _FMT_HS37D5 if style == 'hs37d5' else _FMT_STD
+    return template % (loci['chromosome'], loci['position'],
+                       loci.get('ref_allele', 'N/A'), alt)
 
 
 if __name__ == "__main__":
     if len(sys.argv) > 1:
         # Command line usage
-        rsids = sys.argv[1:]
+        rsids = [_canon(rsid) for rsid in sys.argv[1:]]
         print(f"Looking up {len(rsids)} rsID(s) for hs37d5...\n")
         
-        for rsid in rsids:
-            loci = get_hs37d5_loci(rsid, method='auto')
+        # Lookups share the connection pool; results print in input order
+        with ThreadPoolExecutor(max_workers=min(10, len(rsids))) as executor:
+            results = list(executor.map(
+                lambda rsid: (rsid, get_hs37d5_loci(rsid, method='auto')), rsids))
+        
+        for rsid, loci in results:
             if loci:
                 # Use hs37d5 style (no chr prefix) for display
                 print(f"{loci['rsid']}: {format_loci(loci, style='hs37d5')}")
@@ -256,7 +693,7 @@ if __name__ == "__main__":
         
         # Multiple rsIDs
         rsids = ["rs7412", "rs429358", "rs1799945", "rs1800562"]
-        results = batch_get_loci(rsids, delay=0.2, method='auto')
+        results = batch_get_loci(rsids, method='auto')
         
         for rsid, loci in results.items():
             if loci: